@@ -10,6 +10,7 @@
 # The Imaging Frequency tag (0018, 0084) is extracted and printed in the log.
 
 from ij import IJ
+from ij.util import DicomTools
 from ij.io import OpenDialog
 from ij.gui import WaitForUserDialog
 
@@ -26,16 +27,13 @@ def printImageType(imp):
     """
 
     tr = None
-    info = imp.getInfoProperty()
+    tr_str = DicomTools.getTag(imp, "0018,0080")  # TR tag
 
-    if info is not None:
-        for line in info.split("\n"):
-            if line.startswith("0018,0080"):  # TR tag
-                try:
-                    tr = float(line.split(":")[1].strip())
-                except:
-                    tr = None
-                    IJ.log("Could not parse TR value.")
+    if tr_str is not None:
+        try:
+            tr = float(tr_str.strip())
+        except ValueError:
+            IJ.log("Could not parse TR value.")
 
     if tr is None:
         IJ.log("TR value not found.")
@@ -62,9 +60,6 @@ imp = IJ.openImage(path)
 
 # If imp is None
 
-# Check header info
-info = imp.getInfoProperty()
-
 # Initiate the log 
 IJ.log("---- Central Frequency Test ----")
 
@@ -72,22 +67,12 @@ IJ.log("---- Central Frequency Test ----")
 printImageType(imp)
 	
 # Imaging Frequency tag is (0018, 0084)
-# We need to parse the header string to find this value
-# The header is often a Large string with all the tags and values.
-tag_key = "0018,0084"
-
-# A simple way to find the value is to search for the tag in the string.
-# The format is typically "Tag_ID: Value"
-start_index = info.find(tag_key)
-
-if start_index != -1:
-	# Find the start of the value part
-	value_start = info.find(":", start_index) + 1
-	# Find the end of the line
-	end_index = info.find("\n", value_start)        
-	
-	# Extract and clean up the value
-	central_freq_str = info[value_start:end_index].strip()
+# DicomTools looks the tag up in the header and returns only its value
+central_freq_str = DicomTools.getTag(imp, "0018,0084")
+
+if central_freq_str is not None:
+	# Clean up the value
+	central_freq_str = central_freq_str.strip()
 	try:
 		# Convert the string to a floating-point number
 		central_frequency_mhz = float(central_freq_str)
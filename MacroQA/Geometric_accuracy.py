@@ -12,14 +12,27 @@
 # The lengths of the lines are measured and printed in the log.
 
 
-from ij import IJ, WindowManager
+from ij import IJ
+from ij.util import DicomTools
 from ij.io import OpenDialog
-from ij.measure import ResultsTable
 from ij.gui import WaitForUserDialog, Roi
 from ij import ImagePlus
 import sys
 
 # === All functions used in the script are defined here ===
+
+# === Function to zoom in on the image ===
+def zoom_in(imp, times):
+    """
+    Zooms in on the center of the image canvas, the same as pressing "+" 'times' times,
+    but calling the canvas directly instead of running the "In [+]" command.
+    """
+    canvas = imp.getCanvas()
+    if canvas is None:
+        return
+    for _ in range(times):
+        canvas.zoomIn(canvas.getWidth() // 2, canvas.getHeight() // 2)
+
 # === Function to open DICOM files ===
 def open_dicom_file(prompt):
     """Open a file chooser to select a DICOM file.
@@ -52,22 +65,10 @@ def get_measurement(imp, instruction):
         IJ.error("Invalid ROI", "Please redraw a valid straight-line ROI.")
         return None
 
-    IJ.run("Set Measurements...", "length")
-    IJ.run(imp, "Measure", "")
-
-    rt = ResultsTable.getResultsTable()
-    length = rt.getValue("Length", rt.size() - 1)
+    # calibrated length straight from the line (same value as "Measure")
+    length = roi.getLength()
     IJ.log("Length: {:.3f}".format(length))
     return length
-# === Function to close the Results window if open ===
-def close_result():
-    """
-    Closes the "Results" window if it exists.
-    """
-    # only try if it exists
-    if WindowManager.getWindow("Results") is not None:
-        IJ.selectWindow("Results")
-        IJ.run("Close")
 
 # === Function to print image type based on number of slices ===
 def printImageType(imp):
@@ -80,16 +81,13 @@ def printImageType(imp):
     """
 
     tr = None
-    info = imp.getInfoProperty()
+    tr_str = DicomTools.getTag(imp, "0018,0080")  # TR tag
 
-    if info is not None:
-        for line in info.split("\n"):
-            if line.startswith("0018,0080"):  # TR tag
-                try:
-                    tr = float(line.split(":")[1].strip())
-                except:
-                    tr = None
-                    IJ.log("Could not parse TR value.")
+    if tr_str is not None:
+        try:
+            tr = float(tr_str.strip())
+        except ValueError:
+            IJ.log("Could not parse TR value.")
 
     if tr is None:
         IJ.log("TR value not found.")
@@ -115,8 +113,7 @@ printImageType(localizer)
 
 # Zoom in a couple of times for better precision
 IJ.setTool("line")
-IJ.run("In [+]", "")
-IJ.run("In [+]", "")
+zoom_in(localizer, 2)
 localizer_measurement = get_measurement(localizer, "LOCALIZER: Draw a vertical straight line.")
 localizer.close()
 
@@ -131,8 +128,7 @@ if t1w is None:
 printImageType(t1w)
 
 # Zoom in a couple of times for better precision
-IJ.run("In [+]", "")
-IJ.run("In [+]", "")
+zoom_in(t1w, 2)
 
 # --- Slice 1 ---
 t1w.setSlice(1)
@@ -156,8 +152,7 @@ if slices < 5:
     printImageType(t1w)
 
     # Zoom in a couple of times for better precision
-    IJ.run("In [+]", "")
-    IJ.run("In [+]", "")
+    zoom_in(t1w, 2)
 else:
     t1w.setSlice(5)
     IJ.log("ACR T1w - Slice 5")
@@ -186,8 +181,6 @@ IJ.log("{:.3f}".format(t1_horz_5))
 
 
 WaitForUserDialog("Geometric accuracy test finished. Please collect the results.").show()
-close_result()
 
-IJ.run("Clear Results")
 IJ.log("---- End of the Geometric Accuracy test ----")
 IJ.log("")
@@ -19,6 +19,7 @@
 
 from java.awt import Rectangle
 from ij import IJ, WindowManager
+from ij.util import DicomTools
 from ij.gui import Roi, WaitForUserDialog
 from ij.measure import Measurements
 from ij.plugin.frame import RoiManager
@@ -32,6 +33,18 @@ import math
 
 # === All functions used in the script are defined here ===
 
+# === Function to zoom in on the image ===
+def zoom_in(imp, times):
+    """
+    Zooms in on the center of the image canvas, the same as pressing "+" 'times' times,
+    but calling the canvas directly instead of running the "In [+]" command.
+    """
+    canvas = imp.getCanvas()
+    if canvas is None:
+        return
+    for _ in range(times):
+        canvas.zoomIn(canvas.getWidth() // 2, canvas.getHeight() // 2)
+
 # === Function to open DICOM files ===
 # Prompts the user to select a DICOM image and opens it.
 def open_dicom_file(prompt):
@@ -50,35 +63,22 @@ def open_dicom_file(prompt):
     imp.show()
     return imp
 
+# Titles ImageJ gives the Brightness/Contrast and Window/Level windows
+_WL_TITLES = ("B&C", "W&L")
+
 # === Function to close the W&L window if open ===
 def close_wl():
     """
     Closes any open Brightness/Contrast or Window/Level dialogs.
     """
-    candidates = ["Brightness/Contrast", "W&L", "Window/Level", "B&C"]
-    for t in candidates:
-        w = WindowManager.getWindow(t) or WindowManager.getFrame(t)
-        if w is not None:
-            # closing without prompt
-            try:
-                w.dispose()   # Closes the window
-            except:
-                try:
-                    w.setVisible(False)
-                except:
-                    pass
-            return True
-    # fallback: scan non-image windows and close if the title matches
-    wins = WindowManager.getNonImageWindows() or []
-    for w in wins:
-        try:
-            title = w.getTitle()
-        except:
-            title = ""
-        if title and any(s in title.lower() for s in ["contrast", "brightness", "window/level", "w&l", "b&c"]):
-            w.dispose()
-            return True
-    return False
+    # look the windows up by title instead of scanning every non-image window
+    closed = False
+    for title in _WL_TITLES:
+        win = WindowManager.getWindow(title)
+        if win is not None:
+            win.dispose()    # close the window without asking
+            closed = True
+    return closed
 
 # === Function to print image type based on number of slices ===
 # Localizer: 1 slice | ACR T1w: 11 slices | ACR T2w: 22 slices
@@ -93,16 +93,13 @@ def printImageType(imp):
     """
 
     tr = None
-    info = imp.getInfoProperty()
+    tr_str = DicomTools.getTag(imp, "0018,0080")  # TR tag
 
-    if info is not None:
-        for line in info.split("\n"):
-            if line.startswith("0018,0080"):  # TR tag
-                try:
-                    tr = float(line.split(":")[1].strip())
-                except:
-                    tr = None
-                    IJ.log("Could not parse TR value.")
+    if tr_str is not None:
+        try:
+            tr = float(tr_str.strip())
+        except ValueError:
+            IJ.log("Could not parse TR value.")
 
     if tr is None:
         IJ.log("TR value not found.")
@@ -163,15 +160,11 @@ else:
     imp.setSlice(1)
     IJ.log("Slice set to 1.")
     
-IJ.run(imp, "Original Scale", "")
 IJ.resetMinAndMax(imp)
 IJ.log("Window/Level adjusted to central values.")
 
 # Zoom in a few times (equivalent to pressing the "+" key)
-IJ.run("In [+]", "")
-IJ.run("In [+]", "")
-IJ.run("In [+]", "")
-#IJ.run("In [+]", "")
+zoom_in(imp, 3)
 IJ.setTool("rectangle")
 # Adjust the window to fit the new zoom level
 win = imp.getWindow()
@@ -193,18 +186,14 @@ else:
     bounds = roi.getBounds()
     canvas = imp.getCanvas()
     if canvas is not None:
+        # Magnification that makes the ROI fill the canvas, applied in one step
+        # instead of zooming in repeatedly until the source view fits the ROI
+        mag = min(canvas.getWidth() / float(max(bounds.width, 1)),
+                  canvas.getHeight() / float(max(bounds.height, 1)))
+        canvas.setMagnification(mag)
         # Set the canvas source rectangle to the ROI bounds (focus view on ROI)
         canvas.setSourceRect(Rectangle(bounds.x, bounds.y, bounds.width, bounds.height))
-        imp.updateAndDraw()
-        
-        # Automatically zoom in until the ROI fills the source view
-        while (canvas.getSrcRect().width > bounds.width or 
-               canvas.getSrcRect().height > bounds.height):
-            canvas.zoomIn(bounds.x + bounds.width // 2, bounds.y + bounds.height // 2)
-            canvas.zoomIn(bounds.x + bounds.width // 2, bounds.y + bounds.height // 2)
-            if (canvas.getSrcRect().width <= bounds.width and 
-                canvas.getSrcRect().height <= bounds.height):
-                break
+        # no redraw here: IJ.setMinAndMax below redraws the zoomed view
 
 # ===== Step 3: Automatic window/level adjustment =====
 l, w = 450.0, 150.0
@@ -246,8 +235,6 @@ dlg.show()
 imp.close()
 close_wl()
 
-IJ.run("Clear Results")
-
 IJ.log("Upper hole size [mm]: %s" % ("NaN" if (isinstance(upper_value, float) and math.isnan(upper_value)) else ("%.1f" % upper_value)))
 IJ.log("Lower hole size [mm]: %s" % ("NaN" if (isinstance(lower_value, float) and math.isnan(lower_value)) else ("%.1f" % lower_value)))
 IJ.log("---- End of the High Contrast Spatial Resolution Test ----")
@@ -21,6 +21,7 @@
 from java.awt import Window, Font
 from ij.io import OpenDialog
 from ij import IJ, WindowManager
+from ij.util import DicomTools
 from ij.gui import OvalRoi, WaitForUserDialog, GenericDialog
 from ij.measure import Measurements
 from ij.plugin.frame import RoiManager
@@ -29,14 +30,49 @@ import math
 
 # === All functions used in the script are defined here ===
 
+# === Calibration units supported, with their size in cm ===
+_UNIT_TO_CM = {"mm": 0.1, "cm": 1.0, u"\u00b5m": 1e-4, "um": 1e-4}
+
+# === Function to get the pixel size in cm from the image calibration ===
+def pixel_size_cm(imp):
+    """Returns the pixel size (width, height) in cm from the image calibration.
+    If the unit is missing or not recognized, asks the user for the pixel size in mm.
+    """
+    cal = imp.getCalibration()
+    factor = _UNIT_TO_CM.get((cal.getUnit() or "").lower())
+    if factor is not None:
+        return cal.pixelWidth * factor, cal.pixelHeight * factor
+
+    # If calibration is missing or unrecognized, prompt the user for pixel dimensions in mm
+    gd = GenericDialog("Calibration missing or not recognized")
+    gd.addMessage("Enter the pixel size (in mm).")
+    gd.addNumericField("Pixel width (mm):", 0.0, 6)
+    gd.addNumericField("Pixel height (mm):", 0.0, 6)
+    gd.showDialog()
+    if gd.wasCanceled():
+        IJ.log("Cancelled by user.")
+        raise SystemExit
+    pw_mm = gd.getNextNumber()
+    ph_mm = gd.getNextNumber()
+    if pw_mm <= 0 or ph_mm <= 0:
+        IJ.error("Invalid pixel values")
+        raise SystemExit
+    return pw_mm / 10.0, ph_mm / 10.0
+
 # === Function to convert area in cm² to radius in pixels ===
+# (area, pixel width, pixel height) -> radius, so each radius is computed once
+_radius_cache = {}
+
 def area_to_radius_pixels(area_cm2, px_w_cm, px_h_cm):
     """Converts an area in cm² to the radius in pixels for an oval ROI.
     
     Returns the radius in pixels.
     """
-    pixel_area_cm2 = px_w_cm * px_h_cm
-    return math.sqrt(area_cm2 / (math.pi * pixel_area_cm2))
+    key = (area_cm2, px_w_cm, px_h_cm)
+    if key not in _radius_cache:
+        pixel_area_cm2 = px_w_cm * px_h_cm
+        _radius_cache[key] = math.sqrt(area_cm2 / (math.pi * pixel_area_cm2))
+    return _radius_cache[key]
 
 # === Function to measure mean intensity in ROI ===
 def measure_roi_mean(imp, roi=None):
@@ -49,34 +85,34 @@ def measure_roi_mean(imp, roi=None):
     stats = imp.getStatistics(Measurements.MEAN)
     return stats.mean
 
+# Titles ImageJ gives the Brightness/Contrast and Window/Level windows
+_WL_TITLES = ("B&C", "W&L")
+
 # === Function to close the W&L window if open === 
 def close_wl():
     """Closes any open Brightness/Contrast or Window/Level dialogs.
     
     """
-    candidates = ["Brightness/Contrast", "W&L", "Window/Level", "B&C"]
-    for t in candidates:
-        w = WindowManager.getWindow(t) or WindowManager.getFrame(t)
-        if w is not None:
-            try:
-                w.dispose()
-            except:
-                try:
-                    w.setVisible(False)
-                except:
-                    pass
-            return True
-    # Fallback: search other non-image windows by title
-    wins = WindowManager.getNonImageWindows() or []
-    for w in wins:
-        try:
-            title = w.getTitle()
-        except:
-            title = ""
-        if title and any(s in title.lower() for s in ["contrast", "brightness", "window/level", "w&l", "b&c"]):
-            w.dispose()
-            return True
-    return False
+    # look the windows up by title instead of scanning every non-image window
+    closed = False
+    for title in _WL_TITLES:
+        win = WindowManager.getWindow(title)
+        if win is not None:
+            win.dispose()    # close the window without asking
+            closed = True
+    return closed
+
+# === Function to zoom in on the image ===
+def zoom_in(imp, times):
+    """
+    Zooms in on the center of the image canvas, the same as pressing "+" 'times' times,
+    but calling the canvas directly instead of running the "In [+]" command.
+    """
+    canvas = imp.getCanvas()
+    if canvas is None:
+        return
+    for _ in range(times):
+        canvas.zoomIn(canvas.getWidth() // 2, canvas.getHeight() // 2)
 
 # === Function to open DICOM files ===
 def open_dicom_file(prompt):
@@ -106,16 +142,13 @@ def printImageType(imp):
     """
 
     tr = None
-    info = imp.getInfoProperty()
+    tr_str = DicomTools.getTag(imp, "0018,0080")  # TR tag
 
-    if info is not None:
-        for line in info.split("\n"):
-            if line.startswith("0018,0080"):  # TR tag
-                try:
-                    tr = float(line.split(":")[1].strip())
-                except:
-                    tr = None
-                    IJ.log("Could not parse TR value.")
+    if tr_str is not None:
+        try:
+            tr = float(tr_str.strip())
+        except ValueError:
+            IJ.log("Could not parse TR value.")
 
     if tr is None:
         IJ.log("TR value not found.")
@@ -138,10 +171,9 @@ if imp is None:
 # Identify image type
 printImageType(imp)
 
-# Reset scale and visualization
-IJ.run(imp, "Original Scale", "")
+# Reset visualization and zoom in
 IJ.resetMinAndMax(imp)
-IJ.run("In [+]", ""); IJ.run("In [+]", "")
+zoom_in(imp, 2)
 
 # ===== Step 1: Navigate to slice 7 =====
 if imp.getNSlices() < 7:
@@ -171,38 +203,14 @@ IJ.log("Window/Level adjusted to central values.")
 
 # ===== Step 2: Calibration =====
 cal = imp.getCalibration()
-unit = (cal.getUnit() or "").lower()
-pw = cal.pixelWidth
-ph = cal.pixelHeight
-
-# Handle calibration units (mm, cm, or manual entry)
-if unit == "mm":
-    pixel_width_cm = pw / 10.0
-    pixel_height_cm = ph / 10.0
-elif unit == "cm":
-    pixel_width_cm = pw
-    pixel_height_cm = ph
-else:
-    gd = GenericDialog("Calibration missing or not recognized")
-    gd.addMessage("Enter the pixel size (in mm).")
-    gd.addNumericField("Pixel width (mm):", 0.0, 6)
-    gd.addNumericField("Pixel height (mm):", 0.0, 6)
-    gd.showDialog()
-    if gd.wasCanceled():
-        IJ.log("Cancelled by user.")
-        raise SystemExit
-    pw_mm = gd.getNextNumber()
-    ph_mm = gd.getNextNumber()
-    if pw_mm <= 0 or ph_mm <= 0:
-        IJ.error("Invalid pixel values")
-        raise SystemExit
-    pixel_width_cm = pw_mm / 10.0
-    pixel_height_cm = ph_mm / 10.0
+pixel_width_cm, pixel_height_cm = pixel_size_cm(imp)
 
 IJ.log("Calibration used (cm/pixel): {:.6g} x {:.6g}  (unit='{}')".format(pixel_width_cm, pixel_height_cm, cal.getUnit()))
 
 # ===== Step 3: Place large ROI (200 cm²) =====
+# Both ROI radii are computed once, right after calibration
 radius_large = area_to_radius_pixels(200.0, pixel_width_cm, pixel_height_cm)
+radius_small = area_to_radius_pixels(1.0, pixel_width_cm, pixel_height_cm)
 center_x = imp.getWidth() / 2.0
 center_y = imp.getHeight() / 2.0
 roi_large = OvalRoi(center_x - radius_large, center_y - radius_large, radius_large*2, radius_large*2)
@@ -232,8 +240,8 @@ mean_ref = measure_roi_mean(imp)
 IJ.log("Initial mean (large ROI): {:.3f}".format(mean_ref))
 
 # ===== Step 4: Low-signal adjustment =====
-stats_full = imp.getStatistics()
-min_val = stats_full.min
+# Only the minimum is kept; the statistics object (and its 16-bit histogram) is dropped
+min_val = imp.getStatistics(Measurements.MIN_MAX).min
 IJ.setMinAndMax(imp, min_val, min_val + 1)  # force nearly black display
 IJ.run("Brightness/Contrast...")
 IJ.run("Window/Level...")
@@ -244,7 +252,6 @@ dlg = WaitForUserDialog("Manual adjustment - low signal",
 dlg.show()
 
 # Place small ROI (~1 cm²) in low-signal region
-radius_small = area_to_radius_pixels(1.0, pixel_width_cm, pixel_height_cm)
 roi_small_low = OvalRoi(center_x - radius_small, center_y - radius_small, radius_small*2, radius_small*2)
 imp.setRoi(roi_small_low)
 
@@ -257,7 +264,9 @@ IJ.log("Low signal mean: {:.3f}".format(low_signal))
 
 # Ensure large ROI is saved
 imp.setRoi(roi_large)
-if not any(r == roi_large for r in rm.getRoisAsArray()):
+# (the user may have deleted it from the ROI Manager in the meantime;
+# the manager stores a copy, so look it up by the name addRoi gave it)
+if roi_large.getName() is None or rm.getIndex(roi_large.getName()) < 0:
     rm.addRoi(roi_large)
 
 # ===== Step 5: High-signal adjustment =====
@@ -299,6 +308,5 @@ dlg = WaitForUserDialog("Uniformity test completed, collect the results.")
 dlg.show()
 close_wl()
 imp.close()
-IJ.run("Clear Results")
 IJ.log("---- End of the Image Intensity Uniformity Test ----")
 IJ.log("")
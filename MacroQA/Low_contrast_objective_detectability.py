@@ -12,6 +12,7 @@
 # Results are printed to the log.
 
 from ij import IJ, WindowManager, ImagePlus, ImageStack
+from ij.util import DicomTools
 from ij.io import OpenDialog
 from ij.measure import ResultsTable
 from ij.gui import WaitForUserDialog
@@ -75,37 +76,29 @@ def calculate_window_level(imp):
 
     return level, window
 
+# Titles ImageJ gives the Brightness/Contrast and Window/Level windows
+_WL_TITLES = ("B&C", "W&L")
+
+# === Function to set window/level ===
+def set_window_level(imp, level, window):
+    """Sets the display range from a window/level pair and redraws the image once."""
+    half = window * 0.5
+    imp.setDisplayRange(level - half, level + half)
+    imp.updateAndDraw()
+
 # === Function to close any open Brightness/Contrast or Window/Level dialogs ===
 def close_wl():
     """
     Closes any open Brightness/Contrast or Window/Level dialogs.
     """
-    
-    # Common titles for these windows
-    candidates = ["Brightness/Contrast", "W&L", "Window/Level", "B&C"]
-    for t in candidates:
-        w = WindowManager.getWindow(t) or WindowManager.getFrame(t)
-        if w is not None:
-            # close without prompting
-            try:
-                w.dispose()   # close the window
-            except:
-                try:
-                    w.setVisible(False)
-                except:
-                    pass
-            return True
-    # fallback: scan non-image windows and close if the title matches
-    wins = WindowManager.getNonImageWindows() or []
-    for w in wins:
-        try:
-            title = w.getTitle()
-        except:
-            title = ""
-        if title and any(s in title.lower() for s in ["contrast", "brightness", "window/level", "w&l", "b&c"]):
-            w.dispose()
-            return True
-    return False
+    # look the windows up by title instead of scanning every non-image window
+    closed = False
+    for title in _WL_TITLES:
+        win = WindowManager.getWindow(title)
+        if win is not None:
+            win.dispose()    # close the window without asking
+            closed = True
+    return closed
 
 CANCEL_SENTINEL = float(-2147483648.0)
 
@@ -115,6 +108,18 @@ def get_number_or_nan(prompt, default=1.0):
         return float('nan')
     return v
 
+# === Function to zoom in on the image ===
+def zoom_in(imp, times):
+    """
+    Zooms in on the center of the image canvas, the same as pressing "+" 'times' times,
+    but calling the canvas directly instead of running the "In [+]" command.
+    """
+    canvas = imp.getCanvas()
+    if canvas is None:
+        return
+    for _ in range(times):
+        canvas.zoomIn(canvas.getWidth() // 2, canvas.getHeight() // 2)
+
 # === Function to open a DICOM file ===
 def open_dicom_file(prompt):
     """Opens a file chooser dialog to select a DICOM file.
@@ -143,16 +148,13 @@ def printImageType(imp):
     """
 
     tr = None
-    info = imp.getInfoProperty()
+    tr_str = DicomTools.getTag(imp, "0018,0080")  # TR tag
 
-    if info is not None:
-        for line in info.split("\n"):
-            if line.startswith("0018,0080"):  # TR tag
-                try:
-                    tr = float(line.split(":")[1].strip())
-                except:
-                    tr = None
-                    IJ.log("Could not parse TR value.")
+    if tr_str is not None:
+        try:
+            tr = float(tr_str.strip())
+        except ValueError:
+            IJ.log("Could not parse TR value.")
 
     if tr is None:
         IJ.log("TR value not found.")
@@ -275,8 +277,7 @@ IJ.log("---- Start of Low Contrast Objective Detectability Test ----")
 imp, dcm_type, is_multi_echo = select_and_open_dicom("Click OK to select the T1 image")
 
 # Handling Window/Level: window = 850, level = 1900
-IJ.run("In [+]","")
-IJ.run("In [+]","")
+zoom_in(imp, 2)
 IJ.run("Brightness/Contrast...")
 IJ.run("Window/Level...")
 
@@ -296,10 +297,7 @@ if level is not None:
     window *= 0.8
 
     # Apply to the image
-    min_display = level - window / 2.0
-    max_display = level + window / 2.0
-    imp.setDisplayRange(min_display, max_display)
-    imp.updateAndDraw()
+    set_window_level(imp, level, window)
 
 # Prompt user to perform the analysis for each slice
 WaitForUserDialog("Slice 8 - Perform the analysis and click OK").show()
@@ -325,10 +323,7 @@ if level is not None:
     window *= 0.85
 
     # Apply to the image
-    min_display = level - window / 2.0
-    max_display = level + window / 2.0
-    imp.setDisplayRange(min_display, max_display)
-    imp.updateAndDraw()
+    set_window_level(imp, level, window)
     close_wl()
     IJ.run("Brightness/Contrast...")
     IJ.run("Window/Level...")
@@ -342,8 +337,7 @@ imp.close()
 # Identification of DICOM type
 imp2, dcm_type, is_multi_echo = select_and_open_dicom("Click OK to select the T2 image")
 
-IJ.run("In [+]","")
-IJ.run("In [+]","")
+zoom_in(imp2, 2)
 # Reset Window/Level
 IJ.run("Window/Level...")
 
@@ -372,10 +366,7 @@ if level is not None:
     window *= 1.1
 
     # Apply to the image
-    min_display = level - window / 2.0
-    max_display = level + window / 2.0
-    imp2.setDisplayRange(min_display, max_display)
-    imp2.updateAndDraw()
+    set_window_level(imp2, level, window)
 
 WaitForUserDialog("Slice 8 - Perform the analysis and click OK").show()
 t2_slice8 = get_number_or_nan("Enter the number of complete spokes in slice 8:", 10.0)
@@ -400,10 +391,7 @@ if level is not None:
     window *= 1.1
 
     # Apply to the image
-    min_display = level - window / 2.0
-    max_display = level + window / 2.0
-    imp2.setDisplayRange(min_display, max_display)
-    imp2.updateAndDraw()
+    set_window_level(imp2, level, window)
     close_wl()
     IJ.run("Brightness/Contrast...")
     IJ.run("Window/Level...")
@@ -417,7 +405,6 @@ close_wl()
 
 WaitForUserDialog("Low Contrast Detail Test completed. Collect the results.").show()
 
-IJ.run("Clear Results")
 IJ.log("Number of complete spokes in T1: %s" % ("NaN" if (isinstance(spheres_T1, float) and math.isnan(spheres_T1)) else int(spheres_T1)))
 IJ.log("Number of complete spokes in T2: %s" % ("NaN" if (isinstance(spheres_T2, float) and math.isnan(spheres_T2)) else int(spheres_T2)))
 IJ.log("---- End of Low Contrast Objective Detectability Test ----")
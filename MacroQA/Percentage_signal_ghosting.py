@@ -11,6 +11,7 @@
 
 # Required libraries
 from ij import IJ, WindowManager
+from ij.util import DicomTools
 from ij.gui import OvalRoi, WaitForUserDialog, GenericDialog
 from ij.measure import Measurements
 from ij.plugin.frame import RoiManager
@@ -20,35 +21,33 @@ from java.awt import Font
 
 # === All functions used in the script are defined here ===
 
+# Titles ImageJ gives the Brightness/Contrast and Window/Level windows
+_WL_TITLES = ("B&C", "W&L")
+
 # === Function to close the W&L window if open ===
 def close_wl():
     """Closes any open 'Brightness/Contrast' or 'Window/Level' dialogs.
     """
-    # Common titles for this window
-    candidates = ["Brightness/Contrast", "W&L", "Window/Level", "B&C"]
-    for t in candidates:
-        w = WindowManager.getWindow(t) or WindowManager.getFrame(t)
-        if w is not None:
-            # Closes without asking
-            try:
-                w.dispose()  # Closes the window
-            except:
-                try:
-                    w.setVisible(False)
-                except:
-                    pass
-            return True
-    # Fallback: scan non-image windows and close if the name matches
-    wins = WindowManager.getNonImageWindows() or []
-    for w in wins:
-        try:
-            title = w.getTitle()
-        except:
-            title = ""
-        if title and any(s in title.lower() for s in ["contrast", "brightness", "window/level", "w&l", "b&c"]):
-            w.dispose()
-            return True
-    return False
+    # look the windows up by title instead of scanning every non-image window
+    closed = False
+    for title in _WL_TITLES:
+        win = WindowManager.getWindow(title)
+        if win is not None:
+            win.dispose()    # close the window without asking
+            closed = True
+    return closed
+
+# === Function to zoom in on the image ===
+def zoom_in(imp, times):
+    """
+    Zooms in on the center of the image canvas, the same as pressing "+" 'times' times,
+    but calling the canvas directly instead of running the "In [+]" command.
+    """
+    canvas = imp.getCanvas()
+    if canvas is None:
+        return
+    for _ in range(times):
+        canvas.zoomIn(canvas.getWidth() // 2, canvas.getHeight() // 2)
 
 # === Function to open DICOM files ===
 def open_dicom_file(prompt):
@@ -77,16 +76,13 @@ def printImageType(imp):
     """
 
     tr = None
-    info = imp.getInfoProperty()
+    tr_str = DicomTools.getTag(imp, "0018,0080")  # TR tag
 
-    if info is not None:
-        for line in info.split("\n"):
-            if line.startswith("0018,0080"):  # TR tag
-                try:
-                    tr = float(line.split(":")[1].strip())
-                except:
-                    tr = None
-                    IJ.log("Could not parse TR value.")
+    if tr_str is not None:
+        try:
+            tr = float(tr_str.strip())
+        except ValueError:
+            IJ.log("Could not parse TR value.")
 
     if tr is None:
         IJ.log("TR value not found.")
@@ -97,11 +93,46 @@ def printImageType(imp):
     elif tr >= 1000:
         IJ.log("Image Type: ACR T2-weighted image.")
 
+# === Calibration units supported, with their size in cm ===
+_UNIT_TO_CM = {"mm": 0.1, "cm": 1.0, u"\u00b5m": 1e-4, "um": 1e-4}
+
+# === Function to get the pixel size in cm from the image calibration ===
+def pixel_size_cm(imp):
+    """Returns the pixel size (width, height) in cm from the image calibration.
+    If the unit is missing or not recognized, asks the user for the pixel size in mm.
+    """
+    cal = imp.getCalibration()
+    factor = _UNIT_TO_CM.get((cal.getUnit() or "").lower())
+    if factor is not None:
+        return cal.pixelWidth * factor, cal.pixelHeight * factor
+
+    # If calibration is missing or unrecognized, prompt the user for pixel dimensions in mm
+    gd = GenericDialog("Calibration missing or not recognized")
+    gd.addMessage("Enter the pixel size (in mm).")
+    gd.addNumericField("Pixel width (mm):", 0.0, 6)
+    gd.addNumericField("Pixel height (mm):", 0.0, 6)
+    gd.showDialog()
+    if gd.wasCanceled():
+        IJ.log("Cancelled by user.")
+        raise SystemExit
+    pw_mm = gd.getNextNumber()
+    ph_mm = gd.getNextNumber()
+    if pw_mm <= 0 or ph_mm <= 0:
+        IJ.error("Invalid pixel values.")
+        raise SystemExit
+    return pw_mm / 10.0, ph_mm / 10.0
+
 # === Function to convert area in cm² to radius in pixels ===
+# (area, pixel width, pixel height) -> radius, so each radius is computed once
+_radius_cache = {}
+
 def area_to_radius_pixels(area_cm2, px_w_cm, px_h_cm):
     """Converts a given area in cm^2 to a circle's radius in pixels."""
-    pixel_area_cm2 = px_w_cm * px_h_cm
-    return math.sqrt(area_cm2 / (math.pi * pixel_area_cm2))
+    key = (area_cm2, px_w_cm, px_h_cm)
+    if key not in _radius_cache:
+        pixel_area_cm2 = px_w_cm * px_h_cm
+        _radius_cache[key] = math.sqrt(area_cm2 / (math.pi * pixel_area_cm2))
+    return _radius_cache[key]
 
 # === Function to measure mean intensity in ROI ===
 def measure_roi_mean(imp, roi=None):
@@ -112,14 +143,11 @@ def measure_roi_mean(imp, roi=None):
     return stats.mean
 
 # === Function to create specific ROI size ===
-def create_adjust_roi(imp, length_cm, height_cm, disp_x_px, disp_y_px, title, message):
+def create_adjust_roi(imp, width_px, height_px, disp_x_px, disp_y_px, title, message):
     """
-    Creates an ROI of a specific size at a displaced position and
+    Creates an ROI of a specific size (in pixels) at a displaced position and
     prompts the user to adjust its location.
     """
-    width_px = length_cm / pixel_width_cm
-    height_px = height_cm / pixel_height_cm
-
     # Initial displaced position
     x_pos = center_x - width_px / 2 + disp_x_px
     y_pos = center_y - height_px / 2 + disp_y_px
@@ -148,10 +176,8 @@ if imp is None:
 printImageType(imp)
 
 # Reset display settings and zoom in for user visibility
-IJ.run(imp, "Original Scale", "")
 IJ.resetMinAndMax(imp)
-IJ.run("In [+]", "")
-IJ.run("In [+]", "")
+zoom_in(imp, 2)
 
 # ==== Step 1: Navigate to slice 7 and adjust window/level ====
 if imp.getNSlices() < 7:
@@ -182,33 +208,7 @@ IJ.log("Window/Level adjusted to central values.")
 # --- Step 2: Image Calibration ---
 # This block handles the conversion from real-world units (cm) to pixels.
 cal = imp.getCalibration()
-unit = (cal.getUnit() or "").lower()
-pw = cal.pixelWidth
-ph = cal.pixelHeight
-
-if unit == "mm":
-    pixel_width_cm = pw / 10.0
-    pixel_height_cm = ph / 10.0
-elif unit == "cm":
-    pixel_width_cm = pw
-    pixel_height_cm = ph
-else:
-    # If calibration is missing or unrecognized, prompt the user for pixel dimensions in mm
-    gd = GenericDialog("Calibration missing or not recognized")
-    gd.addMessage("Enter the pixel size (in mm).")
-    gd.addNumericField("Pixel width (mm):", 0.0, 6)
-    gd.addNumericField("Pixel height (mm):", 0.0, 6)
-    gd.showDialog()
-    if gd.wasCanceled():
-        IJ.log("Cancelled by user.")
-        raise SystemExit
-    pw_mm = gd.getNextNumber()
-    ph_mm = gd.getNextNumber()
-    if pw_mm <= 0 or ph_mm <= 0:
-        IJ.error("Invalid pixel values.")
-        raise SystemExit
-    pixel_width_cm = pw_mm / 10.0
-    pixel_height_cm = ph_mm / 10.0
+pixel_width_cm, pixel_height_cm = pixel_size_cm(imp)
 
 IJ.log("Calibration used (cm/pixel) : {:.6g} x {:.6g}  (unit='{}')".format(pixel_width_cm, pixel_height_cm, cal.getUnit()))
 
@@ -255,12 +255,19 @@ dlg.show()
 # These steps create and measure four elliptical ROIs at a specific offset from the phantom center.
 # The signal from these ROIs is used to calculate the ghosting ratio.
 
+# The ghosting ROIs are 1.5 x 20 cm (left/right) or 20 x 1.5 cm (top/bottom),
+# so both sides are converted to pixels once for the four ROIs
+long_px = 20.0 / pixel_width_cm
+short_px = 1.5 / pixel_width_cm
+long_py = 20.0 / pixel_height_cm
+short_py = 1.5 / pixel_height_cm
+
 # Step 4: Right ROI
 offset_x_dir = int(imp.getWidth() * 0.25)  # 25% to the right
 right=create_adjust_roi(
     imp,
-    length_cm=1.5,
-    height_cm=20.0,
+    width_px=short_px,
+    height_px=long_py,
     disp_x_px=offset_x_dir,
     disp_y_px=0,
     title="Right ROI",
@@ -271,8 +278,8 @@ right=create_adjust_roi(
 offset_y_baixo = int(imp.getHeight() * 0.25)  # 25% to the bottom
 btm=create_adjust_roi(
     imp,
-    length_cm=20.0,
-    height_cm=1.5,
+    width_px=long_px,
+    height_px=short_py,
     disp_x_px=0,
     disp_y_px=offset_y_baixo,
     title="Bottom ROI",
@@ -283,8 +290,8 @@ btm=create_adjust_roi(
 offset_y_cima = -int(imp.getHeight() * 0.25)  # 25% to the top
 top=create_adjust_roi(
     imp,
-    length_cm=20.0,
-    height_cm=1.5,
+    width_px=long_px,
+    height_px=short_py,
     disp_x_px=0,
     disp_y_px=offset_y_cima,
     title="Top ROI",
@@ -295,8 +302,8 @@ top=create_adjust_roi(
 offset_x_esq = -int(imp.getWidth() * 0.25)  # 25% to the left
 left=create_adjust_roi(
     imp,
-    length_cm=1.5,
-    height_cm=20.0,
+    width_px=short_px,
+    height_px=long_py,
     disp_x_px=offset_x_esq,
     disp_y_px=0,
     title="Left ROI",
@@ -328,6 +335,5 @@ WaitForUserDialog("Percentage Signal Ghosting Test completed, collect the result
 imp.close()
 close_wl()
 
-IJ.run("Clear Results")
 IJ.log("---- End of Percentage Signal Ghosting Test ----")
 IJ.log("")
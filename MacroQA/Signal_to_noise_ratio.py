@@ -11,16 +11,18 @@
 # and the standard deviation of the noise from a subtracted image (A - B), as described in the ACR phantom test guidelines.
 
 # Required libraries
-from ij import IJ, WindowManager
+from ij import IJ, WindowManager, ImagePlus
+from ij.util import DicomTools
 from ij.gui import WaitForUserDialog, Roi, Line, OvalRoi, GenericDialog
 from ij.io import OpenDialog
 from java.lang import Math
 from ij.measure import ResultsTable
 import math
-from ij.plugin import ImageCalculator
+from ij.process import Blitter
 from ij.measure import Measurements
 from ij.plugin.frame import RoiManager
 from java.awt import Window, Font
+from java.util.concurrent import Callable, Executors
 
 # === All functions used in the script are defined here ===
 
@@ -35,16 +37,13 @@ def printImageType(imp):
     """
 
     tr = None
-    info = imp.getInfoProperty()
+    tr_str = DicomTools.getTag(imp, "0018,0080")  # TR tag
 
-    if info is not None:
-        for line in info.split("\n"):
-            if line.startswith("0018,0080"):  # TR tag
-                try:
-                    tr = float(line.split(":")[1].strip())
-                except:
-                    tr = None
-                    IJ.log("Could not parse TR value.")
+    if tr_str is not None:
+        try:
+            tr = float(tr_str.strip())
+        except ValueError:
+            IJ.log("Could not parse TR value.")
 
     if tr is None:
         IJ.log("TR value not found.")
@@ -55,10 +54,23 @@ def printImageType(imp):
     elif tr >= 1000:
         IJ.log("Image Type: ACR T2-weighted image.")
 
+# === Function to zoom in on the image ===
+def zoom_in(imp, times):
+    """
+    Zooms in on the center of the image canvas, the same as pressing "+" 'times' times,
+    but calling the canvas directly instead of running the "In [+]" command.
+    """
+    canvas = imp.getCanvas()
+    if canvas is None:
+        return
+    for _ in range(times):
+        canvas.zoomIn(canvas.getWidth() // 2, canvas.getHeight() // 2)
+
 # === Function to open DICOM files ===
-def open_dicom_file(prompt):
+def open_dicom_file(prompt, show=True):
     """
     Opens a DICOM file selected via a dialog box.
+    The image is displayed only if show is True.
     Returns the ImagePlus object or None if the operation fails.
     """
     od = OpenDialog(prompt, None)
@@ -69,49 +81,104 @@ def open_dicom_file(prompt):
     if imp is None:
         IJ.error("Fail to open image.")
         return None
-    imp.show()
+    if show:
+        imp.show()
     return imp
 
+# === Task to read a DICOM file on a background thread ===
+class _OpenImage(Callable):
+    """Callable wrapper so the executor returns the opened ImagePlus."""
+    def __init__(self, path):
+        self.path = path
+
+    def call(self):
+        return IJ.openImage(self.path)
+
+# === Calibration units supported, with their size in cm ===
+_UNIT_TO_CM = {"mm": 0.1, "cm": 1.0, u"\u00b5m": 1e-4, "um": 1e-4}
+
+# === Function to get the pixel size in cm from the image calibration ===
+def pixel_size_cm(imp):
+    """Returns the pixel size (width, height) in cm from the image calibration.
+    If the unit is missing or not recognized, asks the user for the pixel size in mm.
+    """
+    cal = imp.getCalibration()
+    factor = _UNIT_TO_CM.get((cal.getUnit() or "").lower())
+    if factor is not None:
+        return cal.pixelWidth * factor, cal.pixelHeight * factor
+
+    # If calibration is missing or unrecognized, prompt the user for pixel dimensions in mm
+    gd = GenericDialog("Fail to calibrate")
+    gd.addMessage("Inform the pixel size (in mm).")
+    gd.addNumericField("Pixel width (mm):", 0.0, 6)
+    gd.addNumericField("Pixel height (mm):", 0.0, 6)
+    gd.showDialog()
+    if gd.wasCanceled():
+        IJ.log("Cancelled by the user.")
+        raise SystemExit
+    pw_mm = gd.getNextNumber()
+    ph_mm = gd.getNextNumber()
+    if pw_mm <= 0 or ph_mm <= 0:
+        IJ.error("Invalid pixel value.")
+        raise SystemExit
+    return pw_mm / 10.0, ph_mm / 10.0
+
 # === Function to convert area in cm² to radius in pixels ===
+# (area, pixel width, pixel height) -> radius, so each radius is computed once
+_radius_cache = {}
+
 def area_to_radius_pixels(area_cm2, px_w_cm, px_h_cm):
     """Converts a given area in cm^2 to a circle's radius in pixels."""
-    pixel_area_cm2 = px_w_cm * px_h_cm
-    return math.sqrt(area_cm2 / (math.pi * pixel_area_cm2))
+    key = (area_cm2, px_w_cm, px_h_cm)
+    if key not in _radius_cache:
+        pixel_area_cm2 = px_w_cm * px_h_cm
+        _radius_cache[key] = math.sqrt(area_cm2 / (math.pi * pixel_area_cm2))
+    return _radius_cache[key]
 
-def measure_roi_mean(imp, roi=None):
-    """Measures the mean pixel value within a given ROI."""
-    if roi is not None:
-        imp.setRoi(roi)
-    stats = imp.getStatistics(Measurements.MEAN)
-    return stats.mean
-
-def measure_roi_std(imp, roi=None):
-    """Measures the standard deviation of pixel values within a given ROI."""
+def measure_roi_mean_std(imp, roi=None):
+    """Measures the mean and standard deviation of pixel values within a given ROI.
+    Both values come from a single statistics pass over the ROI pixels.
+    """
     if roi is not None:
         imp.setRoi(roi)
-    stats = imp.getStatistics(Measurements.STD_DEV)
-    return stats.stdDev
+    stats = imp.getStatistics(Measurements.MEAN | Measurements.STD_DEV)
+    return stats.mean, stats.stdDev
 
 # --- Step 1: Subtract two images to isolate noise ---
-def subtract_two_images_via_calculator():
+def subtract_two_images():
     """
     Guides the user to open two identical T1-weighted images and subtracts them.
     This subtraction isolates the noise component for SNR calculation.
     """
     # 1) Open images A and B
+    # Image A is read on a background thread while the user goes through the
+    # dialogs for image B, then displayed once its slice is set
     WaitForUserDialog("Open the first T1 image to proceed with the SNR test.").show()
-    impA = open_dicom_file("Select the FIRST image (A)")
+    path_A = OpenDialog("Select the FIRST image (A)", None).getPath()
+    if path_A is None: return None, None
     
-    # Adjust display settings for image A
-    IJ.run(impA, "Original Scale", "")
-    IJ.resetMinAndMax(impA)
-    IJ.run("In [+]", "")
-    IJ.run("In [+]", "")
-    if impA is None: return
+    executor = Executors.newSingleThreadExecutor()
+    try:
+        future_A = executor.submit(_OpenImage(path_A))
+        
+        # Image B is only used for the subtraction, so it is never displayed
+        WaitForUserDialog("Open the second T1 image to proceed with the SNR test.").show()
+        impB = open_dicom_file("Select the SECOND image (B)", show=False)
+        if impB is None:
+            # stop reading A, or close it if the read already finished
+            if not future_A.cancel(True):
+                impA = future_A.get()
+                if impA is not None:
+                    impA.close()
+            return None, None
+        impA = future_A.get()
+    finally:
+        executor.shutdown()
     
-    WaitForUserDialog("Open the second T1 image to proceed with the SNR test.").show()
-    impB = open_dicom_file("Select the SECOND image (B)")
-    if impB is None: return
+    if impA is None:
+        IJ.error("Fail to open image.")
+        impB.close()
+        return None, None
     
     # Set both images to slice 7 for consistency
     if impA.getNSlices() < 7:
@@ -119,21 +186,26 @@ def subtract_two_images_via_calculator():
     else:
         impA.setSlice(7)
     
+    # Adjust display settings for image A
+    impA.resetDisplayRange()
+    impA.show()
+    zoom_in(impA, 2)
+    
     if impB.getNSlices() < 7:
         impB.setSlice(1)
     else:
         impB.setSlice(7)
         
  
-    # 4) Image Calculator: A - B (creates a new window)
-    ic = ImageCalculator()
-    result = ic.run("subtract create", impA, impB)  # 'create' => new image
-    if result is not None:
-        result.setTitle("Subtraction (A - B)")
-        result.show()
-        IJ.log("Subtraction finished: A - B")
-    else:
-        IJ.error("Fail to subtract (Image Calculator).")
+    # 4) A - B on the current slices (creates a new window)
+    # Blitter works directly on the slice processors, same result as the
+    # Image Calculator "subtract create" (16-bit, negative values clipped to 0)
+    ip_sub = impA.getProcessor().duplicate()
+    ip_sub.copyBits(impB.getProcessor(), 0, 0, Blitter.SUBTRACT)
+    result = ImagePlus("Subtraction (A - B)", ip_sub)
+    result.setCalibration(impA.getCalibration())
+    result.show()
+    IJ.log("Subtraction finished: A - B")
     
     impB.close()
     
@@ -144,7 +216,7 @@ def subtract_two_images_via_calculator():
 IJ.log("---- Signal to Noise Ratio Test ----")
 
 # Perform image subtraction
-result, impA = subtract_two_images_via_calculator()
+result, impA = subtract_two_images()
 
 # Check if the images were successfully processed and print image type
 if impA is None or result is None:
@@ -156,33 +228,7 @@ printImageType(impA)
 # --- Step 2: Image Calibration ---
 # This block handles the conversion from real-world units (cm) to pixels.
 cal = impA.getCalibration()
-unit = (cal.getUnit() or "").lower()
-pw = cal.pixelWidth
-ph = cal.pixelHeight
-
-if unit == "mm":
-    pixel_width_cm = pw / 10.0
-    pixel_height_cm = ph / 10.0
-elif unit == "cm":
-    pixel_width_cm = pw
-    pixel_height_cm = ph
-else:
-    # If calibration is missing or unrecognized, prompt the user for pixel dimensions in mm
-    gd = GenericDialog("Fail to calibrate")
-    gd.addMessage("Inform the pixel size (in mm).")
-    gd.addNumericField("Pixel width (mm):", 0.0, 6)
-    gd.addNumericField("Pixel height (mm):", 0.0, 6)
-    gd.showDialog()
-    if gd.wasCanceled():
-        IJ.log("Cancelled by the user.")
-        raise SystemExit
-    pw_mm = gd.getNextNumber()
-    ph_mm = gd.getNextNumber()
-    if pw_mm <= 0 or ph_mm <= 0:
-        IJ.error("Invalid pixel value.")
-        raise SystemExit
-    pixel_width_cm = pw_mm / 10.0
-    pixel_height_cm = ph_mm / 10.0
+pixel_width_cm, pixel_height_cm = pixel_size_cm(impA)
 
 IJ.log("Calibration used (cm/pixel): {:.6g} x {:.6g}  (unit='{}')".format(pixel_width_cm, pixel_height_cm, cal.getUnit()))
 
@@ -221,9 +267,9 @@ if gd.wasCanceled():
 
 # --- Calculation of SNR ---
 # The signal (mean) is measured from the original image (impA)
-mean_ref = measure_roi_mean(impA)
+mean_ref, _ = measure_roi_mean_std(impA)
 # The noise (standard deviation) is measured from the subtracted image (result)
-std_ref = measure_roi_std(result)
+_, std_ref = measure_roi_mean_std(result)
 # SNR formula based on ACR guidelines
 SNR = mean_ref / std_ref
 # Note: The ACR method often includes a scaling factor (e.g., * sqrt(2)) depending on the specific protocol.
@@ -238,6 +284,5 @@ result.close()
 IJ.log("Mean: {:.3f}".format(mean_ref))
 IJ.log("Standard Deviation: {:.3f}".format(std_ref))
 IJ.log("SNR: {:.3f}".format(SNR))
-IJ.run("Clear Results")
 IJ.log("---- End of the SNR test ----")
 IJ.log("")
@@ -12,52 +12,43 @@
 
 # Required libraries
 from ij import IJ, WindowManager
+from ij.util import DicomTools
 from ij.gui import WaitForUserDialog, Roi, Line
 from ij.io import OpenDialog
 from java.lang import Math
 from ij.measure import ResultsTable
-from ij.process import ImageStatistics
+from ij.measure import Measurements
 import math
 
 
+# This test's own results table (the global 'Results' table is left untouched)
+RESULTS_TITLE = "Slice Position Results"
+results_table = ResultsTable()
+
 # === All functions used in the script are defined here ===
 
+# Titles ImageJ gives the Brightness/Contrast and Window/Level windows
+_WL_TITLES = ("B&C", "W&L")
+
 # === Function to close the W&L window if open ===
 def close_wl():
     """Closes any open 'Brightness/Contrast' or 'Window/Level' dialogs."""
-    # brightness/contrast window management
-    candidates = ["Brightness/Contrast", "W&L", "Window/Level", "B&C"]
-    for t in candidates:
-        w = WindowManager.getWindow(t) or WindowManager.getFrame(t)
-        if w is not None:
-            # close without asking
-            try:
-                w.dispose()    # close the window
-            except:
-                try:
-                    w.setVisible(False)
-                except:
-                    pass
-            return True
-    # fallback: check non-image windows and close if name it equal
-    wins = WindowManager.getNonImageWindows() or []
-    for w in wins:
-        try:
-            title = w.getTitle()
-        except:
-            title = ""
-        if title and any(s in title.lower() for s in ["contrast", "brightness", "window/level", "w&l", "b&c"]):
-            w.dispose()
-            return True
-    return False
+    # look the windows up by title instead of scanning every non-image window
+    closed = False
+    for title in _WL_TITLES:
+        win = WindowManager.getWindow(title)
+        if win is not None:
+            win.dispose()    # close the window without asking
+            closed = True
+    return closed
 
 # === Function to close the Results window if open ===
 def close_result():
-    """Closes the 'Results' window if it is open."""
+    """Closes this test's results window if it is open."""
     # Get Window only if it exists
-    if WindowManager.getWindow("Results") is not None:
-        IJ.selectWindow("Results")
-        IJ.run("Close")
+    win = WindowManager.getWindow(RESULTS_TITLE)
+    if win is not None:
+        win.close()
 
 # === Function to zoom to a rectangle in pixels ===
 def zoom_to_rect_pixels(x, y, w, h, set_line_tool=True, clear_roi_after=True):
@@ -66,13 +57,26 @@ def zoom_to_rect_pixels(x, y, w, h, set_line_tool=True, clear_roi_after=True):
     Optionally, activates the line tool and clears the ROI after zooming.
     """
     imp = IJ.getImage()
-    imp.setRoi(Roi(int(x), int(y), int(w), int(h)))
+    # no display update here, "To Selection" repaints the canvas anyway
+    imp.setRoi(Roi(int(x), int(y), int(w), int(h)), False)
     # Native ImageJ Command: Image ▸ Zoom ▸ To Selection
     IJ.run(imp, "To Selection", "")
     if set_line_tool:
         IJ.setTool("line")
     if clear_roi_after:
-        imp.killRoi()
+        imp.deleteRoi()
+
+# === Function to zoom in on the image ===
+def zoom_in(imp, times):
+    """
+    Zooms in on the center of the image canvas, the same as pressing "+" 'times' times,
+    but calling the canvas directly instead of running the "In [+]" command.
+    """
+    canvas = imp.getCanvas()
+    if canvas is None:
+        return
+    for _ in range(times):
+        canvas.zoomIn(canvas.getWidth() // 2, canvas.getHeight() // 2)
 
 # === Function to get the measurement from the user-drawn line ===
 def get_measurement(imp, instruction, cutoff_px=127):
@@ -89,40 +93,20 @@ def get_measurement(imp, instruction, cutoff_px=127):
         IJ.error("Invalid ROI", "If the difference is zero in fact, press 'OK' to continue.")
         return int(0)
 
-    # measure: length + centroid (to get 'X' on the table)
-    IJ.run("Set Measurements...", "length centroid")
-    IJ.run(imp, "Measure", "")
-
-    rt = ResultsTable.getResultsTable()
-    row = rt.size() - 1
-
-    length = rt.getValue("Length", row)
-
-    # get X at the centroid coming from own measure
-    x_val = rt.getValue("X", row)  # return NaN if column doesn't exist
-    if math.isnan(x_val):
-        # rare fallback: if for any reason the program doesn't get 'X', use the geometric medium point
-        x_val = (roi.getX1() + roi.getX2()) / 2.0
-        # OBS: already in pixels
-
-    # converts X measured as pixels if the image is calibrated (DICOM etc.)
-    cal = imp.getCalibration()
-    pw = cal.pixelWidth if (cal and cal.pixelWidth) else 1.0
-    # if 'X' came in physical units, dividing by pixelWidth brings it to pixels;
-    # if it was already in pixels, pw=1.0 and nothing changes.
-    x_px = x_val / pw
+    # length comes calibrated from the line itself (same value as "Measure");
+    # X is the line midpoint, already in pixels
+    length = roi.getLength()
+    x_px = (roi.x1d + roi.x2d) / 2.0
 
     # Apply signal rule as half left (x > 127)
     # The length is positive if the measurement is on the left side of the image and negative on the right
     # (or vice-versa, depending on the image convention), indicating mis-positioning direction.
     signed_length = -length if (x_px > float(cutoff_px)) else length
 
-    # optional: refresh table to reflect the signal value
-    try:
-        rt.setValue("Length", row, signed_length)
-        rt.show("Results")
-    except:
-        pass
+    # show the signed value on the table
+    results_table.incrementCounter()
+    results_table.addValue("Length", signed_length)
+    results_table.show(RESULTS_TITLE)
 
     #IJ.log("X_centroide(px)=%.3f  cutoff=%d  comprimento=%.3f" % (x_px, cutoff_px, signed_length))
     return signed_length
@@ -152,14 +136,13 @@ def open_dicom_file(prompt):
 #     imp.setDisplayRange(min_display, max_display)
 #     imp.updateAndDraw()
 
-def adjust_window_level(imp, level, window):
+def adjust_window_level(imp, window):
     """
     Adjusts display window/level based on phantom signal.
     The level is set to ~half the mean signal in the bright phantom region.
-    The window is scaled relative to that mean.
+    The window width is the one given by the caller.
     """
-    ip = imp.getProcessor()
-    stats = ip.getStatistics(ImageStatistics.MEAN | ImageStatistics.MIN_MAX)
+    stats = imp.getStatistics(Measurements.MEAN | Measurements.MIN_MAX)
 
     mean_signal = stats.mean
     min_signal = stats.min
@@ -167,9 +150,7 @@ def adjust_window_level(imp, level, window):
     # Estimate level as ~half the mean bright signal
     level = 0.5 * mean_signal
 
-    # Define window width (heuristic: full mean or scaled)
-    window = window_scale * mean_signal
-
+    # Use the requested window width
     min_display = max(min_signal, level - window / 2.0)
     max_display = level + window / 2.0
 
@@ -199,16 +180,13 @@ def printImageType(imp):
     """
 
     tr = None
-    info = imp.getInfoProperty()
+    tr_str = DicomTools.getTag(imp, "0018,0080")  # TR tag
 
-    if info is not None:
-        for line in info.split("\n"):
-            if line.startswith("0018,0080"):  # TR tag
-                try:
-                    tr = float(line.split(":")[1].strip())
-                except:
-                    tr = None
-                    IJ.log("Could not parse TR value.")
+    if tr_str is not None:
+        try:
+            tr = float(tr_str.strip())
+        except ValueError:
+            IJ.log("Could not parse TR value.")
 
     if tr is None:
         IJ.log("TR value not found.")
@@ -250,18 +228,11 @@ elif imp.getNSlices() > 11:
     IJ.log("Slice set to %d." % int(slice_num))
     
 
-IJ.run(imp, "Original Scale", "")
-# Adjust window/level to central values
-IJ.resetMinAndMax(imp)
-
 # 2x Zoom "+" for better visibility
-IJ.run("In [+]", "")
-IJ.run("In [+]", "")
+zoom_in(imp, 2)
 
-# Adjust Window/Level: window = 10, level = 1000
-adjust_window_level(imp, level=1000, window=10)
-IJ.run("Brightness/Contrast...")
-IJ.run("Window/Level...")
+# Adjust Window/Level: window = 10, level = half the mean phantom signal
+adjust_window_level(imp, window=10)
 
 # Zoom to a specific region of interest to guide the user to the bars
 zoom_to_rect_pixels(x = 100, y = 65, w = 80, h = 10)
@@ -309,7 +280,6 @@ close_result()
 
 WaitForUserDialog("Slice Position Accuracy Test finished. Collect the results.\n").show()
 
-IJ.run("Clear Results")
 IJ.log("Slice 1: {:.3f}".format(medida1))
 IJ.log("Slice 11: {:.3f}".format(medida2))
 IJ.log("---- End of the Slice Position Accuracy Test ----")
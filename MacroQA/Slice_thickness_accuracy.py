@@ -11,6 +11,7 @@
 
 # Required libraries
 from ij import IJ, WindowManager
+from ij.util import DicomTools
 from ij.gui import Roi, WaitForUserDialog
 from ij.measure import Measurements
 from ij.plugin.frame import RoiManager
@@ -18,6 +19,9 @@ from ij.process import ImageStatistics
 from ij.measure import ResultsTable
 from ij.io import OpenDialog
 
+# Title of this test's own results table (the global 'Results' table is left untouched)
+RESULTS_TITLE = "Slice Thickness Results"
+
 # === All functions used in the script are defined here ===
 
 # === Function to open DICOM files ===
@@ -37,13 +41,40 @@ def open_dicom_file(prompt):
     imp.show()
     return imp
 
-# === Function to close the W&L window if open ===
+# === Function to close the Results window if open ===
 def close_result():
-    """Closes the 'Results' window if it is open."""
+    """Closes this test's results window if it is open."""
     # Try if exists
-    if WindowManager.getWindow("Results") is not None:
-        IJ.selectWindow("Results")
-        IJ.run("Close")
+    win = WindowManager.getWindow(RESULTS_TITLE)
+    if win is not None:
+        win.close()
+
+# === Function to measure mean intensity in ROI ===
+def measure_roi_mean(imp, roi=None):
+    """Measures the mean pixel value within a given ROI."""
+    if roi is not None:
+        imp.setRoi(roi)
+    stats = imp.getStatistics(Measurements.MEAN)
+    return stats.mean
+
+# === Function to zoom in on the image ===
+def zoom_in(imp, times):
+    """
+    Zooms in on the center of the image canvas, the same as pressing "+" 'times' times,
+    but calling the canvas directly instead of running the "In [+]" command.
+    """
+    canvas = imp.getCanvas()
+    if canvas is None:
+        return
+    for _ in range(times):
+        canvas.zoomIn(canvas.getWidth() // 2, canvas.getHeight() // 2)
+
+# === Function to set window/level ===
+def set_window_level(imp, level, window):
+    """Sets the display range from a window/level pair and redraws the image once."""
+    half = window * 0.5
+    imp.setDisplayRange(level - half, level + half)
+    imp.updateAndDraw()
 
 # === Function to print image type based on TR value ===
 def printImageType(imp):
@@ -56,16 +87,13 @@ def printImageType(imp):
     """
 
     tr = None
-    info = imp.getInfoProperty()
+    tr_str = DicomTools.getTag(imp, "0018,0080")  # TR tag
 
-    if info is not None:
-        for line in info.split("\n"):
-            if line.startswith("0018,0080"):  # TR tag
-                try:
-                    tr = float(line.split(":")[1].strip())
-                except:
-                    tr = None
-                    IJ.log("Could not parse TR value.")
+    if tr_str is not None:
+        try:
+            tr = float(tr_str.strip())
+        except ValueError:
+            IJ.log("Could not parse TR value.")
 
     if tr is None:
         IJ.log("TR value not found.")
@@ -108,19 +136,13 @@ elif imp.getNSlices() > 11:
     IJ.log("Slice set to %d." % int(slice_num))
 
 # Prepare the environment and image display
-IJ.run("Clear Results")
-IJ.run(imp, "Original Scale", "")
-IJ.run("In [+]", "")
-IJ.run("In [+]", "")
+zoom_in(imp, 2)
 
 # Step 2: Initial Window/Level Adjustment for plane visibility
 # The initial window/level settings (window=300, level=200) are set to highlight the inclined planes.
 window = 300
 level = 200
-min_display = level - window / 2  # 50
-max_display = level + window / 2  # 350
-imp.setDisplayRange(min_display, max_display)
-imp.updateAndDraw()
+set_window_level(imp, level, window)  # display range 50-350
 
 # Step 3: Measure mean signal from two background ROIs
 # This signal is used to automatically adjust the display for better contrast later.
@@ -132,10 +154,7 @@ roi1 = imp.getRoi()
 if roi1 is None or roi1.getType() != Roi.RECTANGLE:
     IJ.error("ROI 1 has an invalid shape or was not selected.")
     raise SystemExit
-imp.setRoi(roi1)
-IJ.run("Measure")
-stats1 = imp.getStatistics(Measurements.MEAN)
-mean1 = stats1.mean
+mean1 = measure_roi_mean(imp, roi1)
 
 # ROI 2 Selection (Background)
 WaitForUserDialog("Select ROI 2 (Rectangle)").show()
@@ -143,20 +162,15 @@ roi2 = imp.getRoi()
 if roi2 is None or roi2.getType() != Roi.RECTANGLE:
     IJ.error("ROI 2 has an invalid shape or was not selected.")
     raise SystemExit
-imp.setRoi(roi2)
-IJ.run("Measure")
-stats2 = imp.getStatistics(Measurements.MEAN)
-mean2 = stats2.mean
+mean2 = measure_roi_mean(imp, roi2)
 
 # Step 4: Refine Window/Level based on measured signal
 # The display is re-adjusted to enhance the visibility of the inclined planes,
-# using the average background signal as the new level.
-level = (mean1 + mean2) / 2
+# centering a narrow window on half of the average measured signal, as in the ACR procedure.
+mean_signal = (mean1 + mean2) / 2
+level = mean_signal / 2.0
 window = 10
-min_display = (level - window) / 2
-max_display = (level + window) / 2
-imp.setDisplayRange(min_display, max_display)
-imp.updateAndDraw()
+set_window_level(imp, level, window)
 
 # Step 5: Measure the inclined planes with line ROIs
 # The user draws lines along the visible planes to measure their lengths.
@@ -168,8 +182,6 @@ roi3 = imp.getRoi()
 if roi3 is None or roi3.getType() != Roi.LINE:
     IJ.error("ROI 3 has an invalid shape or was not selected.")
     raise SystemExit
-imp.setRoi(roi3)
-IJ.run("Measure")
 length3 = roi3.getLength()
 
 # ROI 4 Selection (Inclined Plane 2)
@@ -178,8 +190,6 @@ roi4 = imp.getRoi()
 if roi4 is None or roi4.getType() != Roi.LINE:
     IJ.error("ROI 4 has an invalid shape or was not selected.")
     raise SystemExit
-imp.setRoi(roi4)
-IJ.run("Measure")
 length4 = roi4.getLength()
 
 # Step 6: Calculate the final slice thickness
@@ -189,17 +199,16 @@ results = 0.2 * (length3 * length4) / (length3 + length4)
 
 # Step 7: Display and save results
 # Add the result to the results table
-rt = ResultsTable.getResultsTable()
+rt = ResultsTable()
 rt.incrementCounter()
 rt.addValue("Final result", results)
-rt.show("Results")
+rt.show(RESULTS_TITLE)
     
 WaitForUserDialog("Slice Thickness Accuracy Test completed, collect the results.").show()
 
 # Clean up and finalize
 imp.close()
 close_result()
-IJ.run("Clear Results")
 IJ.log("Slice thickness: {:.3f}".format(results))
 IJ.log("{:.3f}".format(results))
 IJ.log("---- End of the Slice Thickness Accuracy Test ----")